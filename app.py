@@ -1,113 +1,42 @@
 import streamlit as st
-import pandas as pd
-from io import BytesIO
-import altair as alt
-import re
+import numpy as np
 
-# Ensure openpyxl is available
-try:
-    import openpyxl
-except ImportError:
-    st.error("The 'openpyxl' library is not installed. Please ensure it is included in your environment (e.g., via requirements.txt).")
-    st.stop()
+from iislog import (
+    AGG_COLUMNS,
+    create_parquet,
+    create_pivot_table,
+    create_xlsx,
+    generate_summary,
+    get_error_apps,
+    group_requests,
+    hourly_timeline,
+    parse_iis_log,
+)
 
-def parse_iis_log(file_content):
-    try:
-        lines = file_content.decode('utf-8', errors='ignore').splitlines()
-        fields = None
-        data = []
-        
-        for line in lines:
-            if line.startswith('#'):
-                if line.startswith('#Fields:'):
-                    fields = line.split()[1:]
-                continue
-            if fields and line.strip():
-                row = line.split()
-                if len(row) == len(fields):
-                    data.append(row)
-        
-        if not fields or not data:
-            raise ValueError("Invalid IIS log format or no data found")
-        
-        df = pd.DataFrame(data, columns=fields)
-        
-        # Convert relevant columns to numeric
-        numeric_cols = ['s-port', 'sc-status', 'sc-substatus', 'sc-win32-status', 'sc-bytes', 'cs-bytes', 'time-taken']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        # Convert time-taken from milliseconds to seconds
-        if 'time-taken' in df.columns:
-            df['time-taken'] = df['time-taken'] / 1000.0  # Convert ms to seconds
-        
-        # Combine date and time into datetime if present
-        if 'date' in df.columns and 'time' in df.columns:
-            df['datetime'] = pd.to_datetime(df['date'] + ' ' + df['time'], errors='coerce')
-        
-        return df
-    except Exception as e:
-        raise ValueError(f"Error parsing log file: {str(e)}")
-
-def generate_summary(df):
-    try:
-        if 'sc-status' not in df.columns or 'time-taken' not in df.columns:
-            raise ValueError("Required columns 'sc-status' or 'time-taken' not found in log data")
-        
-        summary = df.groupby('sc-status').agg(
-            count=('sc-status', 'size'),
-            avg_time_taken=('time-taken', 'mean'),
-            max_time_taken=('time-taken', 'max'),
-            min_time_taken=('time-taken', 'min')
-        ).reset_index()
-        
-        summary.columns = ['sc_status', 'count', 'avg_time_taken (sec)', 'max_time_taken (sec)', 'min_time_taken (sec)']
-        return summary
-    except Exception as e:
-        raise ValueError(f"Error generating summary: {str(e)}")
-
-def create_pivot_table(df):
-    if 'sc-status' in df.columns and 'cs-uri-stem' in df.columns:
-        pivot = pd.pivot_table(
-            df,
-            values='time-taken',
-            index='cs-uri-stem',
-            columns='sc-status',
-            aggfunc=['count', 'mean', 'max'],
-            fill_value=0
-        )
-        pivot.columns = ['_'.join(map(str, col)) for col in pivot.columns]
-        pivot.columns = [col.replace('mean', 'mean (sec)').replace('max', 'max (sec)') for col in pivot.columns]
-        return pivot.reset_index()
-    return None
-
-def get_error_apps(df):
-    if 'sc-status' in df.columns and 'cs-uri-stem' in df.columns:
-        errors = df[df['sc-status'] >= 500]
-        error_summary = errors.groupby('cs-uri-stem').agg(
-            error_count=('sc-status', 'size'),
-            avg_time=('time-taken', 'mean'),
-            max_time=('time-taken', 'max')
-        ).reset_index()
-        error_summary.columns = ['cs-uri-stem', 'error_count', 'avg_time (sec)', 'max_time (sec)']
-        return error_summary
-    return None
+# Every plotted row is sent to the browser, so the error scatter keeps only the slowest requests
+MAX_SCATTER_POINTS = 5000
 
-def create_xlsx(summary_df, raw_df, pivot_df=None, error_df=None):
-    try:
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            summary_df.to_excel(writer, sheet_name='StatusSummary', index=False)
-            raw_df.to_excel(writer, sheet_name='RawData', index=False)
-            if pivot_df is not None:
-                pivot_df.to_excel(writer, sheet_name='PivotTable', index=False)
-            if error_df is not None:
-                error_df.to_excel(writer, sheet_name='ErrorSummary', index=False)
-        output.seek(0)
-        return output
-    except Exception as e:
-        raise ValueError(f"Error creating XLSX file: {str(e)}")
+# Streamlit reruns the script on every interaction; cache the whole pipeline on the uploaded bytes
+@st.cache_data(show_spinner=False, max_entries=4)
+def process_log(file_content):
+    raw_df = parse_iis_log(file_content)
+    agg_df = raw_df[[col for col in AGG_COLUMNS if col in raw_df.columns]]
+    grouped = group_requests(agg_df)
+    summary_df = generate_summary(grouped)
+    pivot_df = create_pivot_table(grouped)
+    error_df = get_error_apps(grouped)
+    timeline_df = hourly_timeline(agg_df)
+    
+    # Error rows are masked once; the scatter and the raw preview both gather from the same mask
+    error_mask = agg_df['sc-status'].ge(500).to_numpy(dtype=bool, na_value=False)
+    error_total = int(error_mask.sum())
+    error_plot_df = agg_df[error_mask].nlargest(MAX_SCATTER_POINTS, 'time-taken')
+    error_preview_df = raw_df.iloc[np.flatnonzero(error_mask)[:50]]
+    
+    xlsx_output = create_xlsx(summary_df, pivot_df, error_df)
+    parquet_output = create_parquet(raw_df)
+    return (summary_df, pivot_df, error_df, timeline_df, error_total, error_plot_df, error_preview_df,
+            xlsx_output.getvalue(), parquet_output.getvalue())
 
 st.title("IIS Log Analyzer with Visualizations")
 
@@ -124,17 +53,20 @@ uploaded_file = st.file_uploader("Upload IIS .log file", type=["log"])
 if uploaded_file:
     try:
         file_content = uploaded_file.read()
-        raw_df = parse_iis_log(file_content)
-        summary_df = generate_summary(raw_df)
-        pivot_df = create_pivot_table(raw_df)
-        error_df = get_error_apps(raw_df)
-        
-        xlsx_output = create_xlsx(summary_df, raw_df, pivot_df, error_df)
+        (summary_df, pivot_df, error_df, timeline_df, error_total, error_plot_df, error_preview_df,
+         xlsx_output, parquet_output) = process_log(file_content)
         
         st.success("File processed successfully!")
         
         st.download_button(
-            label="Download XLSX (with Pivot and Error Summary)",
+            label="Download Raw Data (Parquet)",
+            data=parquet_output,
+            file_name="IIS_log_raw.parquet",
+            mime="application/vnd.apache.parquet"
+        )
+        
+        st.download_button(
+            label="Download XLSX Summary (with Pivot and Error Summary)",
             data=xlsx_output,
             file_name="IIS_log_summary.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
@@ -156,11 +88,12 @@ if uploaded_file:
         
         # Visualizations with Custom Colors
         st.subheader("Visualizations")
+        import altair as alt  # Imported here so a cold start doesn't pay for it before a file is uploaded
         color_scale = alt.Scale(domain=['200', '500'], range=['#1f77b4', '#ff3333'])  # Vibrant blue for 200, red for 500
         
-        # Bar Chart: Status Code Counts
-        if 'sc-status' in raw_df.columns:
-            status_counts = raw_df['sc-status'].value_counts().reset_index()
+        # Bar Chart: Status Code Counts (already counted in the status summary)
+        if not summary_df.empty:
+            status_counts = summary_df[['sc_status', 'count']]
             status_counts.columns = ['Status', 'Count']
             bar_chart = alt.Chart(status_counts).mark_bar().encode(
                 x='Status:O',
@@ -173,10 +106,8 @@ if uploaded_file:
             st.altair_chart(bar_chart, use_container_width=True)
         
         # Timeline: Requests Over Time
-        if 'datetime' in raw_df.columns:
-            raw_df['hour'] = raw_df['datetime'].dt.floor('H')
-            timeline_data = raw_df.groupby('hour').size().reset_index(name='Request Count')
-            line_chart = alt.Chart(timeline_data).mark_line(color='#2ca02c').encode(  # Vibrant green
+        if timeline_df is not None:
+            line_chart = alt.Chart(timeline_df).mark_line(color='#2ca02c').encode(  # Vibrant green
                 x='hour:T',
                 y='Request Count:Q',
                 tooltip=['hour', 'Request Count']
@@ -186,10 +117,9 @@ if uploaded_file:
             st.altair_chart(line_chart, use_container_width=True)
         
         # Scatter Plot: Error Response Times
-        if 'datetime' in raw_df.columns and 'time-taken' in raw_df.columns:
-            errors = raw_df[raw_df['sc-status'] >= 500]
-            if not errors.empty:
-                scatter = alt.Chart(errors).mark_circle().encode(
+        if 'datetime' in error_plot_df.columns:
+            if not error_plot_df.empty:
+                scatter = alt.Chart(error_plot_df).mark_circle().encode(
                     x='datetime:T',
                     y='time-taken:Q',
                     color=alt.Color('sc-status:O', scale=color_scale),
@@ -198,6 +128,8 @@ if uploaded_file:
                     labelFontSize=12, titleFontSize=14
                 ).configure_title(fontSize=16, color='#333')
                 st.altair_chart(scatter, use_container_width=True)
+                if error_total > MAX_SCATTER_POINTS:
+                    st.caption(f"Showing the {MAX_SCATTER_POINTS} slowest of {error_total} error requests.")
             else:
                 st.info("No errors to plot.")
         
@@ -206,14 +138,10 @@ if uploaded_file:
         st.dataframe(summary_df)
         
         st.subheader("Preview of Raw Data (first 50 rows with errors, status >= 500)")
-        if 'sc-status' in raw_df.columns:
-            error_rows = raw_df[raw_df['sc-status'] >= 500].head(50)
-            if not error_rows.empty:
-                st.dataframe(error_rows)
-            else:
-                st.info("No error rows (status >= 500) found in the log.")
+        if not error_preview_df.empty:
+            st.dataframe(error_preview_df)
         else:
-            st.info("No status column found in the log.")
+            st.info("No error rows (status >= 500) found in the log.")
         
     except Exception as e:
         st.error(f"Error processing file: {str(e)}")
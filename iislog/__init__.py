@@ -0,0 +1,11 @@
+from iislog.parser import (
+    AGG_COLUMNS,
+    create_parquet,
+    create_pivot_table,
+    create_xlsx,
+    generate_summary,
+    get_error_apps,
+    group_requests,
+    hourly_timeline,
+    parse_iis_log,
+)
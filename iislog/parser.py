@@ -0,0 +1,201 @@
+import pandas as pd
+import numpy as np
+from io import BytesIO
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pac
+
+# Low-cardinality string fields stored as categoricals so grouping runs on integer codes
+CATEGORICAL_COLS = ['cs-uri-stem', 'cs-method', 's-ip', 'c-ip', 'cs-host']
+
+# Numeric IIS fields, cast after reading to the narrowest int that holds them
+# (byte counts stay 64-bit, responses can exceed 2 GB)
+NUMERIC_TYPES = {
+    's-port': pa.int32(),
+    'sc-status': pa.int16(),
+    'sc-substatus': pa.int16(),
+    'sc-win32-status': pa.uint32(),
+    'sc-bytes': pa.int64(),
+    'cs-bytes': pa.int64(),
+    'time-taken': pa.int32(),
+}
+
+# Columns the aggregations and charts read; everything else only goes to the raw data export
+AGG_COLUMNS = ['cs-uri-stem', 'sc-status', 'time-taken', 'datetime']
+
+def read_header(file_content):
+    # Only the header block is scanned; the last #Fields: line before the data wins.
+    # A leading UTF-8 BOM and blank lines are skipped, as the old line loop did
+    fields = None
+    pos = 3 if file_content.startswith(b'\xef\xbb\xbf') else 0
+    while pos < len(file_content):
+        end = file_content.find(b'\n', pos)
+        if end == -1:
+            end = len(file_content)
+        line = file_content[pos:end]
+        if line.strip() and not line.startswith(b'#'):
+            break
+        if line.startswith(b'#Fields:'):
+            fields = line.decode('utf-8', errors='ignore').split()[1:]
+        pos = end + 1
+    return fields, min(pos, len(file_content))
+
+def to_int(column, arrow_type):
+    # Tokens that aren't integers in range become null, like the old to_numeric(errors='coerce')
+    limits = np.iinfo(arrow_type.to_pandas_dtype())
+    numeric = pc.and_(pc.ascii_is_decimal(column), pc.less_equal(pc.binary_length(column), 18))
+    values = pc.cast(pc.if_else(numeric, column, pa.scalar(None, pa.string())), pa.int64())
+    in_range = pc.and_(pc.greater_equal(values, int(limits.min)), pc.less_equal(values, int(limits.max)))
+    return pc.cast(pc.if_else(in_range, values, pa.scalar(None, pa.int64())), arrow_type)
+
+def parse_iis_log(file_content):
+    try:
+        # Arrow rejects invalid UTF-8; drop bad bytes as the old decode(errors='ignore') did (ASCII logs skip this).
+        # Done before the header scan so the data offset points into the cleaned buffer
+        if not file_content.isascii():
+            file_content = file_content.decode('utf-8', errors='ignore').encode('utf-8')
+        
+        # Trailing whitespace would add an empty column and get the row skipped; split() used to ignore it
+        while b' \r\n' in file_content or b' \n' in file_content:
+            file_content = file_content.replace(b' \r\n', b'\r\n').replace(b' \n', b'\n')
+        
+        fields, data_start = read_header(file_content)
+        if not fields or data_start >= len(file_content):
+            raise ValueError("Invalid IIS log format or no data found")
+        
+        table = pac.read_csv(
+            pa.BufferReader(pa.py_buffer(file_content).slice(data_start)),
+            # Arrow splits the body into blocks on newline boundaries and parses them across its thread pool
+            read_options=pac.ReadOptions(column_names=fields, use_threads=True),
+            parse_options=pac.ParseOptions(
+                delimiter=' ',
+                quote_char=False,
+                # Rows that don't match #Fields: are dropped, like the old line-length check
+                invalid_row_handler=lambda row: 'skip'
+            ),
+            # Everything is read as text; numeric fields are cast below so one bad token can't fail the upload
+            convert_options=pac.ConvertOptions(
+                column_types={col: pa.string() for col in fields},
+                strings_can_be_null=False
+            )
+        )
+        
+        # Later comment blocks are skipped by their '#' prefix, whatever their token count
+        comments = pc.starts_with(table[fields[0]], '#')
+        if pc.any(comments).as_py():
+            table = table.filter(pc.invert(comments))
+        
+        for col, arrow_type in NUMERIC_TYPES.items():
+            if col in fields:
+                table = table.set_column(fields.index(col), col, to_int(table[col], arrow_type))
+        
+        if table.num_rows == 0:
+            raise ValueError("Invalid IIS log format or no data found")
+        
+        # Combine date and time into datetime if present, joined and parsed in Arrow rather than as Python strings
+        if 'date' in fields and 'time' in fields:
+            stamps = pc.binary_join_element_wise(table['date'], table['time'], ' ')
+            table = table.append_column('datetime', pc.strptime(stamps, format='%Y-%m-%d %H:%M:%S', unit='s', error_is_null=True))
+        
+        # Columns stay Arrow-backed (zero-copy, contiguous strings, '-' fields stay null instead of turning ints into floats)
+        df = table.to_pandas(types_mapper=pd.ArrowDtype)
+        
+        # Convert time-taken from milliseconds to seconds
+        if 'time-taken' in df.columns:
+            df['time-taken'] = df['time-taken'] / 1000.0  # Convert ms to seconds
+        
+        df = df.astype({col: 'category' for col in CATEGORICAL_COLS if col in df.columns})
+        
+        return df
+    except Exception as e:
+        raise ValueError(f"Error parsing log file: {str(e)}")
+
+def group_requests(df):
+    # Single pass over the raw rows; summary, pivot and error tables are all derived from this
+    try:
+        if 'sc-status' not in df.columns or 'time-taken' not in df.columns:
+            raise ValueError("Required columns 'sc-status' or 'time-taken' not found in log data")
+        
+        keys = ['cs-uri-stem', 'sc-status'] if 'cs-uri-stem' in df.columns else ['sc-status']
+        return df.groupby(keys, observed=True)['time-taken'].agg(['size', 'count', 'sum', 'max', 'min'])
+    except Exception as e:
+        raise ValueError(f"Error grouping log data: {str(e)}")
+
+def generate_summary(grouped):
+    try:
+        by_status = grouped.groupby(level='sc-status').agg(
+            {'size': 'sum', 'count': 'sum', 'sum': 'sum', 'max': 'max', 'min': 'min'}
+        )
+        summary = pd.DataFrame({
+            'count': by_status['size'],
+            'avg_time_taken': by_status['sum'] / by_status['count'],
+            'max_time_taken': by_status['max'],
+            'min_time_taken': by_status['min']
+        }).reset_index()
+        
+        summary.columns = ['sc_status', 'count', 'avg_time_taken (sec)', 'max_time_taken (sec)', 'min_time_taken (sec)']
+        return summary
+    except Exception as e:
+        raise ValueError(f"Error generating summary: {str(e)}")
+
+def create_pivot_table(grouped):
+    if 'cs-uri-stem' in grouped.index.names:
+        pivot = pd.DataFrame({
+            'count': grouped['count'],
+            'mean (sec)': grouped['sum'] / grouped['count'],
+            'max (sec)': grouped['max']
+        }).unstack('sc-status', fill_value=0).fillna(0)
+        pivot.columns = [f"{agg}_{status}" for agg, status in pivot.columns]
+        return pivot.reset_index()
+    return None
+
+def get_error_apps(grouped):
+    if 'cs-uri-stem' in grouped.index.names:
+        errors = grouped[grouped.index.get_level_values('sc-status') >= 500]
+        by_uri = errors.groupby(level='cs-uri-stem', observed=True).agg(
+            {'size': 'sum', 'count': 'sum', 'sum': 'sum', 'max': 'max'}
+        )
+        error_summary = pd.DataFrame({
+            'error_count': by_uri['size'],
+            'avg_time': by_uri['sum'] / by_uri['count'],
+            'max_time': by_uri['max']
+        }).reset_index()
+        error_summary.columns = ['cs-uri-stem', 'error_count', 'avg_time (sec)', 'max_time (sec)']
+        return error_summary
+    return None
+
+def hourly_timeline(df):
+    # Bucket on integer epoch hours instead of flooring every timestamp into a new datetime column
+    if 'datetime' not in df.columns:
+        return None
+    epoch_hours = df['datetime'].dropna().to_numpy().astype('datetime64[h]').view('int64')
+    counts = pd.Series(epoch_hours).value_counts().sort_index()
+    return pd.DataFrame({
+        'hour': counts.index.to_numpy().astype('datetime64[h]').astype('datetime64[s]'),
+        'Request Count': counts.to_numpy()
+    })
+
+def create_xlsx(summary_df, pivot_df=None, error_df=None):
+    try:
+        output = BytesIO()
+        # constant_memory is not used: pandas writes cells column by column, which that mode silently drops
+        with pd.ExcelWriter(output, engine='xlsxwriter', engine_kwargs={'options': {'strings_to_urls': False}}) as writer:
+            summary_df.to_excel(writer, sheet_name='StatusSummary', index=False)
+            if pivot_df is not None:
+                pivot_df.to_excel(writer, sheet_name='PivotTable', index=False)
+            if error_df is not None:
+                error_df.to_excel(writer, sheet_name='ErrorSummary', index=False)
+        output.seek(0)
+        return output
+    except Exception as e:
+        raise ValueError(f"Error creating XLSX file: {str(e)}")
+
+def create_parquet(raw_df):
+    # Categorical columns are stored dictionary-encoded, which keeps the file small
+    try:
+        output = BytesIO()
+        raw_df.to_parquet(output, engine='pyarrow', compression='zstd', index=False)
+        output.seek(0)
+        return output
+    except Exception as e:
+        raise ValueError(f"Error creating Parquet file: {str(e)}")